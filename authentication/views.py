@@ -34,7 +34,7 @@ class RegisterView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
         user.is_active = True  # Ensure user is active
-        user.save()
+        user.save(update_fields=['is_active'])
         return Response(serializer.data, status=201)
 
 class UserProfileView(APIView):
@@ -9,4 +9,7 @@ python3 -m pip install -r requirements.txt
 python3 manage.py collectstatic --no-input
 
 # Apply any outstanding database migrations
-python3 manage.py migrate
\ No newline at end of file
+python3 manage.py migrate
+
+# Create the table backing the ORS directions cache (no-op once it exists)
+python3 manage.py createcachetable
@@ -1,5 +1,12 @@
+import zoneinfo
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Least
 from django.utils import timezone
 from datetime import timedelta, datetime, time
+from bisect import bisect_left, bisect_right
 from tracking.models import ELDLog, Trip
 from authentication.models import User
 
@@ -12,6 +19,34 @@ MANDATORY_BREAK_DURATION = 0.5
 WEEKLY_LIMIT = 70
 CYCLE_DAYS = 8 # 8-day cycle for 70 hours
 
+# Resolved once; "today" boundaries are taken in the project time zone
+LOCAL_TIMEZONE = zoneinfo.ZoneInfo(settings.TIME_ZONE)
+
+# Thresholds checked once per log in the backwards shift/break searches
+REQUIRED_REST_SECONDS = REQUIRED_REST_DURATION * 3600
+MANDATORY_BREAK_SECONDS = MANDATORY_BREAK_DURATION * 3600
+
+HOS_STATUS_CACHE_TIMEOUT = 30 # Seconds a cached HOS status is served before recalculating
+
+def hos_status_cache_key(driver_id):
+    """Cache key for a driver's current HOS status (see HOSStatusView)."""
+    return f"hos:{driver_id}"
+
+def invalidate_hos_status(driver_id):
+    """
+    Drop the driver's cached HOS status once the current transaction commits, so
+    the next read recalculates from the committed logs. Runs immediately outside
+    a transaction.
+    """
+    transaction.on_commit(lambda: cache.delete(hos_status_cache_key(driver_id)))
+
+def effective_end_time(check_time):
+    """
+    Expression for a log's end_time clipped to check_time, with logs still in
+    progress (no end_time) counted as running until check_time.
+    """
+    return Least(Coalesce('end_time', Value(check_time)), Value(check_time))
+
 def get_hos_status(driver: User, check_time: datetime = None):
     """
     Calculates the driver's current HOS status and remaining hours.
@@ -37,26 +72,119 @@ def get_hos_status(driver: User, check_time: datetime = None):
     if check_time is None:
         check_time = timezone.now()
 
-    # --- 1. Calculate 70-Hour/8-Day Cycle ---
     cycle_start_time = check_time - timedelta(days=CYCLE_DAYS)
-    # Get logs within the cycle lookback period that ended before check_time
-    cycle_logs = ELDLog.objects.filter(
-        trip__driver=driver,
+    # Fetch every log in the cycle lookback period once, as plain
+    # (event_type, start_time, effective_end_time) tuples. The shift, break and today's-total
+    # searches only look inside this window, so they all reuse this ordered
+    # list instead of issuing their own queries.
+    logs = list(ELDLog.objects.filter(
+        driver_id=driver.id,
         start_time__gte=cycle_start_time,
         start_time__lt=check_time # Only count logs fully or partially completed before check_time
-    ).order_by('start_time')
+    ).annotate(
+        effective_end_time=effective_end_time(check_time)
+    ).order_by('start_time').values_list('event_type', 'start_time', 'effective_end_time'))
+
+    return _calculate_hos_status(driver.id, logs, check_time)
+
+def get_hos_status_bulk(driver_ids, check_time: datetime = None):
+    """
+    Calculates the current HOS status for several drivers at once, e.g. for a fleet
+    dashboard. All of their cycle-window logs are fetched in a single query and
+    grouped by driver, instead of running get_hos_status once per driver.
+
+    Args:
+        driver_ids: Iterable of driver (User) ids.
+        check_time: The datetime object to check status at (defaults to now).
+
+    Returns:
+        A dictionary mapping each driver id to the same status dictionary
+        get_hos_status returns.
+    """
+    if check_time is None:
+        check_time = timezone.now()
+
+    cycle_start_time = check_time - timedelta(days=CYCLE_DAYS)
+    logs_by_driver = {driver_id: [] for driver_id in driver_ids}
+    driver_logs = ELDLog.objects.filter(
+        driver_id__in=list(logs_by_driver),
+        start_time__gte=cycle_start_time,
+        start_time__lt=check_time
+    ).annotate(
+        effective_end_time=effective_end_time(check_time)
+    ).order_by('start_time').values_list('driver_id', 'event_type', 'start_time', 'effective_end_time')
+
+    # Rows arrive in start_time order, so each driver's list stays ordered too
+    for driver_id, event_type, start_time, end_time in driver_logs:
+        logs_by_driver[driver_id].append((event_type, start_time, end_time))
+
+    # The shift search falls back to a driver's last log before the window when it
+    # finds no qualifying rest inside it, so fetch that row for every driver up front
+    last_older_log = ELDLog.objects.filter(
+        driver_id=OuterRef('pk'),
+        start_time__lt=cycle_start_time
+    ).order_by('-start_time').values('pk')[:1]
+    older_logs = {
+        driver_id: (event_type, start_time, end_time)
+        for driver_id, event_type, start_time, end_time in ELDLog.objects.filter(
+            pk__in=User.objects.filter(id__in=list(logs_by_driver)).values(older_log_id=Subquery(last_older_log))
+        ).annotate(
+            effective_end_time=effective_end_time(check_time)
+        ).values_list('driver_id', 'event_type', 'start_time', 'effective_end_time')
+    }
+
+    return {
+        driver_id: _calculate_hos_status(driver_id, logs, check_time, older_logs)
+        for driver_id, logs in logs_by_driver.items()
+    }
+
+def _calculate_hos_status(driver_id, logs, check_time, older_logs=None):
+    """
+    Works out the HOS status dictionary (see get_hos_status) from a driver's
+    (event_type, start_time, effective_end_time) logs in the cycle window, ordered by
+    start_time. Each end time is already clipped to check_time (see effective_end_time).
+
+    older_logs optionally maps driver ids to their last log before the cycle window,
+    as prefetched by get_hos_status_bulk; otherwise that log is queried when needed.
+    """
+    # --- 1. Calculate 70-Hour/8-Day Cycle ---
+    cycle_start_time = check_time - timedelta(days=CYCLE_DAYS)
+
+    # Work in epoch seconds from here on: each log's times are converted once, so every
+    # duration below is a plain float subtraction rather than a timedelta
+    check_ts = check_time.timestamp()
+    cycle_start_ts = cycle_start_time.timestamp()
+    timeline = [
+        (event_type, start_time.timestamp(), end_time.timestamp())
+        for event_type, start_time, end_time in logs
+    ]
+
+    # The cycle pass also records each log's start and a running total of driving time,
+    # so the later sections can find any trailing run of logs with a bisect and sum
+    # its driving with one subtraction instead of scanning the logs again. It also keeps
+    # the latest end time seen so far (logs can overlap), so today's totals can tell
+    # where every earlier log has already ended.
+    log_starts = []
+    driving_totals = [0.0]
+    latest_ends = [float('-inf')]
 
     cycle_on_duty_seconds = 0
-    for log in cycle_logs:
-        if log.event_type in ['driving', 'on_duty']:
-            # Determine the effective end time for calculation (either actual end or check_time)
-            effective_end_time = log.end_time if log.end_time and log.end_time < check_time else check_time
+    for event_type, start_ts, end_ts in timeline:
+        log_starts.append(start_ts)
+        latest_ends.append(end_ts if end_ts > latest_ends[-1] else latest_ends[-1])
+        driving_seconds = 0.0
+
+        if event_type in ['driving', 'on_duty']:
             # Ensure we only count duration within the cycle window and before check_time
-            effective_start_time = max(log.start_time, cycle_start_time)
+            effective_start_ts = start_ts if start_ts > cycle_start_ts else cycle_start_ts
+
+            if end_ts > effective_start_ts:
+                 cycle_on_duty_seconds += end_ts - effective_start_ts
 
-            if effective_end_time > effective_start_time:
-                 duration_in_window = (effective_end_time - effective_start_time).total_seconds()
-                 cycle_on_duty_seconds += duration_in_window
+            if event_type == 'driving' and end_ts > start_ts:
+                 driving_seconds = end_ts - start_ts
+
+        driving_totals.append(driving_totals[-1] + driving_seconds)
 
     cycle_total_hours = cycle_on_duty_seconds / 3600
     remaining_cycle_hours = max(0, WEEKLY_LIMIT - cycle_total_hours)
@@ -64,68 +192,69 @@ def get_hos_status(driver: User, check_time: datetime = None):
     # --- 2. Calculate 11-Hour Driving and 14-Hour Window ---
     # Find the start of the current duty period by looking backwards from check_time
     # for the last period of >= REQUIRED_REST_DURATION hours off-duty/sleeper
-    logs_for_shift_search = ELDLog.objects.filter(
-        trip__driver=driver,
-        start_time__lt=check_time
-    ).order_by('-start_time') # Look backwards
-
-    shift_start_time = None
+    shift_start_ts = None
     accumulated_off_duty_seconds = 0
-    previous_log_start = check_time
+    previous_log_start = check_ts
 
-    for log in logs_for_shift_search:
-        is_off_duty_type = log.event_type in ['off_duty', 'sleeper_berth']
-        log_end = log.end_time if log.end_time and log.end_time < previous_log_start else previous_log_start
+    for event_type, start_ts, end_ts in reversed(timeline): # Look backwards
+        is_off_duty_type = event_type in ['off_duty', 'sleeper_berth']
+        log_end = end_ts if end_ts < previous_log_start else previous_log_start
 
         if is_off_duty_type:
-            duration_seconds = (log_end - log.start_time).total_seconds()
-            accumulated_off_duty_seconds += duration_seconds
-            if accumulated_off_duty_seconds >= REQUIRED_REST_DURATION * 3600:
+            accumulated_off_duty_seconds += log_end - start_ts
+            if accumulated_off_duty_seconds >= REQUIRED_REST_SECONDS:
                 # Found the start of the shift (end of the qualifying break)
-                shift_start_time = log_end
+                shift_start_ts = log_end
                 break
         else:
             # Reset accumulated off-duty time if an on-duty/driving period is encountered
              accumulated_off_duty_seconds = 0
 
-        previous_log_start = log.start_time
+        previous_log_start = start_ts
         # If we reach the cycle start time without finding a break, the shift started before that
-        if log.start_time <= cycle_start_time:
+        if start_ts <= cycle_start_ts:
              # Heuristic: Assume shift started just after the cycle window began if no break found
              # This might need refinement based on how far back you store logs
-             shift_start_time = cycle_start_time # Fallback, may not be accurate
+             shift_start_ts = cycle_start_ts # Fallback, may not be accurate
              break
+    else:
+        # No qualifying rest inside the cycle window. Only now look at the log just
+        # before the window, which the backwards search would have reached next.
+        if older_logs is None:
+            older_log = ELDLog.objects.filter(
+                driver_id=driver_id,
+                start_time__lt=cycle_start_time
+            ).annotate(
+                effective_end_time=effective_end_time(check_time)
+            ).order_by('-start_time').values_list('event_type', 'start_time', 'effective_end_time').first()
+        else:
+            older_log = older_logs.get(driver_id)
+
+        if older_log is not None:
+            shift_start_ts = cycle_start_ts # Same fallback as above
+            event_type, start_time, end_time = older_log
+            if event_type in ['off_duty', 'sleeper_berth']:
+                end_ts = end_time.timestamp()
+                log_end = end_ts if end_ts < previous_log_start else previous_log_start
+                accumulated_off_duty_seconds += log_end - start_time.timestamp()
+                if accumulated_off_duty_seconds >= REQUIRED_REST_SECONDS:
+                    shift_start_ts = log_end
 
     # If no logs found or no shift start identified, assume default/zero values
-    if shift_start_time is None:
+    if shift_start_ts is None:
         # This might happen if the driver hasn't worked recently or logs are missing
         # Set defaults assuming a full fresh shift is available
-        shift_start_time = check_time # Or some other sensible default
+        shift_start_ts = check_ts # Or some other sensible default
         driving_in_shift_hours = 0
         duty_window_elapsed_hours = 0
     else:
-        # Calculate driving and duty time since shift_start_time
-        shift_logs = ELDLog.objects.filter(
-            trip__driver=driver,
-            start_time__gte=shift_start_time,
-            start_time__lt=check_time
-        ).order_by('start_time')
-
-        driving_in_shift_seconds = 0
-        duty_in_shift_seconds = 0 # Includes driving and on_duty
-
-        for log in shift_logs:
-            effective_end = log.end_time if log.end_time and log.end_time < check_time else check_time
-            duration_in_shift_seconds = (effective_end - log.start_time).total_seconds()
-
-            if duration_in_shift_seconds > 0:
-                duty_in_shift_seconds += duration_in_shift_seconds # All time since shift start counts towards window
-                if log.event_type == 'driving':
-                    driving_in_shift_seconds += duration_in_shift_seconds
+        # Calculate driving time since the shift started
+        shift_first_log = bisect_left(log_starts, shift_start_ts)
+        driving_in_shift_seconds = driving_totals[-1] - driving_totals[shift_first_log]
 
         driving_in_shift_hours = driving_in_shift_seconds / 3600
         # Duty window calculation needs refinement for split sleeper if implemented
-        duty_window_elapsed_hours = (check_time - shift_start_time).total_seconds() / 3600
+        duty_window_elapsed_hours = (check_ts - shift_start_ts) / 3600
 
     remaining_driving_hours = max(0, MAX_DRIVING_HOURS_PER_SHIFT - driving_in_shift_hours)
     remaining_duty_window_hours = max(0, MAX_DUTY_WINDOW - duty_window_elapsed_hours)
@@ -134,72 +263,61 @@ def get_hos_status(driver: User, check_time: datetime = None):
     # --- 3. Calculate Time Since Last 30-Min Break ---
     # Look backwards from check_time for the end of the last break >= 30 mins
     driving_since_break_seconds = 0
-    last_break_end_time = shift_start_time # Start search from shift start
-
-    logs_for_break_search = ELDLog.objects.filter(
-        trip__driver=driver,
-        start_time__gte=shift_start_time, # Only consider logs within current shift
-        start_time__lt=check_time
-    ).order_by('-start_time')
+    last_break_end_ts = shift_start_ts # Start search from shift start
 
     accumulated_break_seconds = 0
     break_found = False
-    previous_log_start_for_break = check_time
+    previous_log_start_for_break = check_ts
 
-    for log in logs_for_break_search:
-         is_break_type = log.event_type in ['off_duty', 'sleeper_berth'] 
-         log_end_for_break = log.end_time if log.end_time and log.end_time < previous_log_start_for_break else previous_log_start_for_break
+    for event_type, start_ts, end_ts in reversed(timeline):
+         if start_ts < shift_start_ts: # Only consider logs within current shift
+             break
+         is_break_type = event_type in ['off_duty', 'sleeper_berth'] 
+         log_end_for_break = end_ts if end_ts < previous_log_start_for_break else previous_log_start_for_break
 
          if is_break_type:
-             duration_seconds = (log_end_for_break - log.start_time).total_seconds()
-             accumulated_break_seconds += duration_seconds
-             if accumulated_break_seconds >= MANDATORY_BREAK_DURATION * 3600:
-                 last_break_end_time = log_end_for_break
+             accumulated_break_seconds += log_end_for_break - start_ts
+             if accumulated_break_seconds >= MANDATORY_BREAK_SECONDS:
+                 last_break_end_ts = log_end_for_break
                  break_found = True
                  break 
          else:
              # Reset accumulated break time if non-break period encountered
              accumulated_break_seconds = 0
 
-         previous_log_start_for_break = log.start_time
+         previous_log_start_for_break = start_ts
 
-    # Calculate driving time since last_break_end_time
+    # Calculate driving time since the last break ended
     if break_found:
-        driving_since_break_logs = ELDLog.objects.filter(
-            trip__driver=driver,
-            event_type='driving',
-            start_time__gte=last_break_end_time,
-            start_time__lt=check_time
-        ).order_by('start_time')
-
-        for log in driving_since_break_logs:
-            effective_end = log.end_time if log.end_time and log.end_time < check_time else check_time
-            driving_since_break_seconds += (effective_end - log.start_time).total_seconds()
+        break_first_log = bisect_left(log_starts, last_break_end_ts)
+        driving_since_break_seconds = driving_totals[-1] - driving_totals[break_first_log]
 
     driving_since_break_hours = driving_since_break_seconds / 3600
     time_until_break_required = max(0, DRIVING_HOURS_BEFORE_BREAK - driving_since_break_hours)
 
 
     # --- 4. Calculate Today's Totals (Optional but useful) ---
-    today_start = timezone.make_aware(datetime.combine(check_time.date(), time.min))
-    today_logs = ELDLog.objects.filter(
-        trip__driver=driver,
-        start_time__lt=check_time,
-        end_time__gt=today_start # Overlaps with today
-    ).order_by('start_time')
+    # Today always falls inside the cycle window, so only the tail of the loaded logs
+    # is summed. It starts at the first log starting today, or earlier if a log that
+    # started before midnight runs into today: latest_ends never decreases, so a bisect
+    # finds the last point where every log before it had ended by midnight.
+    today_start_ts = datetime.combine(check_time.date(), time.min, tzinfo=LOCAL_TIMEZONE).timestamp()
+    first_today_log = min(
+        bisect_left(log_starts, today_start_ts),
+        bisect_right(latest_ends, today_start_ts) - 1
+    )
 
     on_duty_today_seconds = 0
     driving_today_seconds = 0
-    for log in today_logs:
-         effective_start = max(log.start_time, today_start)
-         effective_end = log.end_time if log.end_time and log.end_time < check_time else check_time
-         duration_today_seconds = (effective_end - effective_start).total_seconds()
+    for event_type, start_ts, end_ts in timeline[first_today_log:]:
+         if event_type not in ['driving', 'on_duty']:
+             continue
+         duration_today_seconds = end_ts - (start_ts if start_ts > today_start_ts else today_start_ts)
 
          if duration_today_seconds > 0:
-             if log.event_type in ['driving', 'on_duty']:
-                 on_duty_today_seconds += duration_today_seconds
-                 if log.event_type == 'driving':
-                     driving_today_seconds += duration_today_seconds
+             on_duty_today_seconds += duration_today_seconds
+             if event_type == 'driving':
+                 driving_today_seconds += duration_today_seconds
 
     on_duty_today_hours = on_duty_today_seconds / 3600
     driving_today_hours = driving_today_seconds / 3600
@@ -212,8 +330,8 @@ def get_hos_status(driver: User, check_time: datetime = None):
     if remaining_cycle_hours <= 0: errors.append("Cycle limit reached or exceeded.")
     if time_until_break_required <= 0 and driving_since_break_hours > 0: # Check if break needed
          # Check if currently driving - if so, it's a violation
-         current_status_log = ELDLog.objects.filter(trip__driver=driver).latest('start_time')
-         if current_status_log.event_type == 'driving':
+         current_event_type = logs[-1][0]
+         if current_event_type == 'driving':
               errors.append("Mandatory break required, currently driving.")
          else:
               errors.append("Mandatory break required.")
@@ -227,7 +345,7 @@ def get_hos_status(driver: User, check_time: datetime = None):
         "on_duty_today": round(on_duty_today_hours, 2),
         "driving_today": round(driving_today_hours, 2),
         "cycle_total_hours": round(cycle_total_hours, 2),
-        "shift_start_time": shift_start_time.isoformat() if shift_start_time else None,
+        "shift_start_time": datetime.fromtimestamp(shift_start_ts, tz=check_time.tzinfo).isoformat(),
         "driving_in_shift_hours": round(driving_in_shift_hours, 2),
         "duty_window_elapsed_hours": round(duty_window_elapsed_hours, 2),
         "driving_since_last_break_hours": round(driving_since_break_hours, 2),
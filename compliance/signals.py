@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from tracking.models import ELDLog
+from .services import invalidate_hos_status
+
+
+@receiver(post_save, sender=ELDLog)
+@receiver(post_delete, sender=ELDLog)
+def invalidate_hos_status_on_log_change(sender, instance, **kwargs):
+    """Drop the driver's cached HOS status once a change to one of their ELD logs commits."""
+    invalidate_hos_status(instance.driver_id)
@@ -1,3 +1,110 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
 from django.test import TestCase
 
-# Create your tests here.
+from authentication.models import User
+from tracking.models import ELDLog, Trip
+
+from .services import get_hos_status, get_hos_status_bulk
+
+CHECK_TIME = datetime(2025, 3, 10, 12, 0, tzinfo=dt_timezone.utc)
+CYCLE_START = CHECK_TIME - timedelta(days=8)
+
+
+class HOSStatusTests(TestCase):
+    def make_driver(self, username):
+        driver = User.objects.create_user(username=username, password='password')
+        trip = Trip.objects.create(
+            driver=driver,
+            current_location='Chicago, IL',
+            pickup_location='Chicago, IL',
+            dropoff_location='Denver, CO',
+            current_cycle_used=0,
+        )
+        return driver, trip
+
+    def log(self, trip, event_type, start_time, end_time=None):
+        duration = (end_time - start_time).total_seconds() / 3600 if end_time else 0
+        return ELDLog.objects.create(
+            trip=trip,
+            event_type=event_type,
+            duration=duration,
+            start_time=start_time,
+            end_time=end_time,
+        )
+
+    def test_shift_starts_after_rest_before_cycle_window(self):
+        driver, trip = self.make_driver('rested')
+        # 11h in the sleeper berth that began before the cycle window
+        self.log(trip, 'sleeper_berth', CYCLE_START - timedelta(hours=10), CYCLE_START + timedelta(hours=1))
+        self.log(trip, 'driving', CYCLE_START + timedelta(hours=1), CYCLE_START + timedelta(hours=3))
+
+        status = get_hos_status(driver, CHECK_TIME)
+
+        self.assertEqual(status['shift_start_time'], (CYCLE_START + timedelta(hours=1)).isoformat())
+        self.assertEqual(status['driving_in_shift_hours'], 2.0)
+        self.assertEqual(status['remaining_driving_hours'], 9.0)
+
+    def test_shift_falls_back_to_cycle_start_without_prior_rest(self):
+        driver, trip = self.make_driver('unrested')
+        self.log(trip, 'on_duty', CYCLE_START - timedelta(hours=10), CYCLE_START + timedelta(hours=1))
+        self.log(trip, 'driving', CYCLE_START + timedelta(hours=1), CYCLE_START + timedelta(hours=3))
+
+        status = get_hos_status(driver, CHECK_TIME)
+
+        self.assertEqual(status['shift_start_time'], CYCLE_START.isoformat())
+        self.assertEqual(status['driving_in_shift_hours'], 2.0)
+
+    def test_open_log_runs_until_check_time(self):
+        driver, trip = self.make_driver('driving')
+        self.log(trip, 'off_duty', CHECK_TIME - timedelta(hours=14), CHECK_TIME - timedelta(hours=3))
+        self.log(trip, 'driving', CHECK_TIME - timedelta(hours=3), CHECK_TIME - timedelta(hours=2, minutes=30))
+        self.log(trip, 'off_duty', CHECK_TIME - timedelta(hours=2, minutes=30), CHECK_TIME - timedelta(hours=2))
+        self.log(trip, 'driving', CHECK_TIME - timedelta(hours=2))
+
+        status = get_hos_status(driver, CHECK_TIME)
+
+        self.assertEqual(status['shift_start_time'], (CHECK_TIME - timedelta(hours=3)).isoformat())
+        self.assertEqual(status['driving_in_shift_hours'], 2.5)
+        self.assertEqual(status['remaining_driving_hours'], 8.5)
+        self.assertEqual(status['remaining_duty_window_hours'], 11.0)
+        self.assertEqual(status['time_until_break_required'], 6.0)
+        self.assertEqual(status['driving_today'], 2.5)
+        self.assertEqual(status['cycle_total_hours'], 2.5)
+
+    def test_overlapping_log_before_midnight_counts_today(self):
+        driver, trip = self.make_driver('overlapping')
+        midnight = datetime(2025, 3, 10, tzinfo=dt_timezone.utc)
+        # The on-duty log runs past midnight while a shorter log inside it ends before
+        self.log(trip, 'on_duty', midnight - timedelta(hours=4), midnight + timedelta(hours=3))
+        self.log(trip, 'off_duty', midnight - timedelta(hours=2), midnight - timedelta(hours=1))
+        self.log(trip, 'driving', midnight + timedelta(hours=10), midnight + timedelta(hours=11))
+
+        status = get_hos_status(driver, CHECK_TIME)
+
+        self.assertEqual(status['on_duty_today'], 4.0)
+        self.assertEqual(status['driving_today'], 1.0)
+
+    def test_bulk_matches_single_driver_status(self):
+        rested, trip = self.make_driver('rested')
+        self.log(trip, 'sleeper_berth', CYCLE_START - timedelta(hours=10), CYCLE_START + timedelta(hours=1))
+        self.log(trip, 'driving', CYCLE_START + timedelta(hours=1), CYCLE_START + timedelta(hours=3))
+
+        unrested, trip = self.make_driver('unrested')
+        self.log(trip, 'on_duty', CYCLE_START - timedelta(hours=10), CYCLE_START + timedelta(hours=1))
+        self.log(trip, 'driving', CYCLE_START + timedelta(hours=1), CYCLE_START + timedelta(hours=3))
+
+        driving, trip = self.make_driver('driving')
+        self.log(trip, 'off_duty', CHECK_TIME - timedelta(hours=14), CHECK_TIME - timedelta(hours=3))
+        self.log(trip, 'driving', CHECK_TIME - timedelta(hours=3), CHECK_TIME - timedelta(hours=1))
+        self.log(trip, 'on_duty', CHECK_TIME - timedelta(hours=1))
+
+        idle, _ = self.make_driver('idle')
+        drivers = [rested, unrested, driving, idle]
+
+        statuses = get_hos_status_bulk([driver.id for driver in drivers], CHECK_TIME)
+
+        self.assertEqual(set(statuses), {driver.id for driver in drivers})
+        for driver in drivers:
+            with self.subTest(driver=driver.username):
+                self.assertEqual(statuses[driver.id], get_hos_status(driver, CHECK_TIME))
@@ -1,11 +1,15 @@
 # Create this file: togemi/compliance/views.py
 
+import logging
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions, status
 from django.shortcuts import get_object_or_404
+from django.core.cache import cache
 from authentication.models import User
-from .services import get_hos_status 
+from .services import get_hos_status, hos_status_cache_key, HOS_STATUS_CACHE_TIMEOUT
+
+logger = logging.getLogger(__name__)
 
 class HOSStatusView(APIView):
     """
@@ -22,10 +26,18 @@ class HOSStatusView(APIView):
              return Response({"error": "User is not a driver."}, status=status.HTTP_403_FORBIDDEN)
 
         try:
-            hos_status = get_hos_status(driver=driver) # Use the service function
+            # Polling clients hit this repeatedly, so it is served from the shared (Redis)
+            # cache rather than the database. The entry is dropped once a change to one of
+            # the driver's ELD logs commits (see signals.py); a read racing that commit can
+            # re-cache the old status, so staleness is bounded by HOS_STATUS_CACHE_TIMEOUT.
+            cache_key = hos_status_cache_key(driver.id)
+            hos_status = cache.get(cache_key)
+            if hos_status is None:
+                hos_status = get_hos_status(driver=driver) # Use the service function
+                cache.set(cache_key, hos_status, HOS_STATUS_CACHE_TIMEOUT)
             return Response(hos_status, status=status.HTTP_200_OK)
-        except Exception as e:
-            print(f"Error calculating HOS status for driver {driver.id}: {e}")
+        except Exception:
+            logger.exception("Error calculating HOS status for driver %s", driver.id)
             return Response({"error": "Failed to calculate HOS status."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 #add items
\ No newline at end of file
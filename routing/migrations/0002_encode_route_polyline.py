@@ -0,0 +1,37 @@
+# Generated by Django 4.2.20 on 2026-10-15 22:15
+
+import ast
+
+from django.db import migrations, models
+
+from routing.polyline import encode_polyline, decode_polyline
+
+
+def encode_existing_polylines(apps, schema_editor):
+    Route = apps.get_model('routing', 'Route')
+    for route in Route.objects.filter(route_polyline__startswith='['):
+        route.route_polyline = encode_polyline(ast.literal_eval(route.route_polyline))
+        route.save(update_fields=['route_polyline'])
+
+
+def decode_existing_polylines(apps, schema_editor):
+    Route = apps.get_model('routing', 'Route')
+    for route in Route.objects.exclude(route_polyline__startswith='['):
+        route.route_polyline = str(decode_polyline(route.route_polyline))
+        route.save(update_fields=['route_polyline'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routing', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='route',
+            name='route_polyline',
+            field=models.TextField(help_text='Google encoded polyline of the route'),
+        ),
+        migrations.RunPython(encode_existing_polylines, decode_existing_polylines),
+    ]
@@ -1,12 +1,18 @@
 from django.db import models
 from tracking.models import Trip
+from .polyline import decode_polyline
 
 class Route(models.Model):
     trip = models.OneToOneField(Trip, on_delete=models.CASCADE, related_name="route")
     distance = models.FloatField() 
     duration = models.FloatField()  
-    route_polyline = models.TextField()  
+    route_polyline = models.TextField(help_text="Google encoded polyline of the route")
     stops = models.JSONField(default=list)  
 
     def __str__(self):
         return f"Route for Trip {self.trip.id}"
+
+    @property
+    def coordinates(self):
+        """Decoded [lng, lat] points of the route polyline."""
+        return decode_polyline(self.route_polyline)
@@ -0,0 +1,49 @@
+"""
+Google encoded polyline format helpers.
+
+Routes are stored in this format rather than as str(list_of_coords): it is several
+times smaller and map clients can decode it directly.
+"""
+
+def encode_polyline(coordinates, precision=5):
+    """Encodes [lng, lat] pairs (GeoJSON order, as returned by ORS) into a polyline string."""
+    factor = 10 ** precision
+    output = []
+    previous_lat = previous_lng = 0
+
+    for lng, lat in coordinates:
+        lat = int(round(lat * factor))
+        lng = int(round(lng * factor))
+        for delta in (lat - previous_lat, lng - previous_lng):
+            delta = ~(delta << 1) if delta < 0 else delta << 1
+            while delta >= 0x20:
+                output.append(chr((0x20 | (delta & 0x1f)) + 63))
+                delta >>= 5
+            output.append(chr(delta + 63))
+        previous_lat, previous_lng = lat, lng
+
+    return ''.join(output)
+
+def decode_polyline(encoded, precision=5):
+    """Decodes a polyline string back into [lng, lat] pairs."""
+    factor = 10 ** precision
+    coordinates = []
+    index = lat = lng = 0
+
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        coordinates.append([lng / factor, lat / factor])
+
+    return coordinates
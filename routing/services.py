@@ -1,11 +1,44 @@
+import hashlib
+import logging
 import openrouteservice
 from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta 
+from bisect import bisect_left
+from math import radians, sin, cos, asin, sqrt
 from tracking.models import Trip, ELDLog 
+from compliance.services import invalidate_hos_status
 from .models import Route
+from .polyline import encode_polyline
+
+logger = logging.getLogger(__name__)
 
 client = openrouteservice.Client(key=settings.ORS_API_KEY)
+ORS_PROFILE = 'driving-car'
+DIRECTIONS_CACHE_TIMEOUT = 60 * 60 * 24 # Seconds to reuse ORS directions for the same pickup/dropoff
+
+EARTH_RADIUS_MILES = 3958.8
+
+# HOS regulations for property-carrying drivers
+MAX_DRIVING_HOURS_PER_SHIFT = 11  # Maximum 11 hours driving time within a 14-hour window
+MAX_DUTY_WINDOW = 14        # 14-hour driving window limit
+MANDATORY_BREAK_DURATION = 0.5  # 30-minute break required after 8 hours driving
+DRIVING_HOURS_BEFORE_BREAK = 8  # Drive hours before mandatory break
+REQUIRED_REST_DURATION = 10     # 10 consecutive hours off-duty required
+WEEKLY_LIMIT = 70           # 70-hour/8-day limit (as per assumption)
+FUEL_STOP_INTERVAL = 1000   # Miles before needing fuel (as per assumption)
+FUEL_STOP_DURATION = 0.5    # Duration for fueling stop (example)
+PICKUP_DURATION = 1.0       # Duration for pickup (as per assumption)
+DROPOFF_DURATION = 1.0      # Duration for dropoff (as per assumption)
+
+def haversine_miles(point_a, point_b):
+    """Great-circle distance in miles between two [lng, lat] points."""
+    lng1, lat1 = radians(point_a[0]), radians(point_a[1])
+    lng2, lat2 = radians(point_b[0]), radians(point_b[1])
+    h = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * asin(sqrt(h))
 
 def get_stops_along_route(distance, duration, current_cycle_used, coordinates):
     """
@@ -23,18 +56,6 @@ def get_stops_along_route(distance, duration, current_cycle_used, coordinates):
     stops = []
     avg_speed = distance / duration if duration > 0 else 65  # mph
 
-    # HOS regulations for property-carrying drivers
-    MAX_DRIVING_HOURS_PER_SHIFT = 11  # Maximum 11 hours driving time within a 14-hour window
-    MAX_DUTY_WINDOW = 14        # 14-hour driving window limit
-    MANDATORY_BREAK_DURATION = 0.5  # 30-minute break required after 8 hours driving
-    DRIVING_HOURS_BEFORE_BREAK = 8  # Drive hours before mandatory break
-    REQUIRED_REST_DURATION = 10     # 10 consecutive hours off-duty required
-    WEEKLY_LIMIT = 70           # 70-hour/8-day limit (as per assumption)
-    FUEL_STOP_INTERVAL = 1000   # Miles before needing fuel (as per assumption)
-    FUEL_STOP_DURATION = 0.5    # Duration for fueling stop (example)
-    PICKUP_DURATION = 1.0       # Duration for pickup (as per assumption)
-    DROPOFF_DURATION = 1.0      # Duration for dropoff (as per assumption)
-
     # Trip state variables
     remaining_distance = distance
     elapsed_trip_time = 0.0         # Total time including rests/breaks
@@ -42,8 +63,17 @@ def get_stops_along_route(distance, duration, current_cycle_used, coordinates):
     driving_since_last_break = 0.0  # Tracks driving towards 8-hour break limit
     duty_window_elapsed = 0.0       # *** NEW: Tracks time against 14-hour window ***
     on_duty_hours_in_cycle = current_cycle_used # Tracks hours against 70-hour limit
+    miles_driven = 0.0              # Distance covered so far
     current_position_index = 0      # Index into route coordinates
 
+    # Cumulative distance along the polyline at each coordinate, so a stop can be
+    # placed by bisecting on miles driven. Scaled so the polyline's own length
+    # lines up with the route distance reported by ORS.
+    cumulative_miles = [0.0]
+    for point_a, point_b in zip(coordinates, coordinates[1:]):
+        cumulative_miles.append(cumulative_miles[-1] + haversine_miles(point_a, point_b))
+    polyline_miles_per_route_mile = cumulative_miles[-1] / distance if distance > 0 else 0
+
     # --- Initial Pickup Stop ---
     stops.append({
         "location": "Pickup Point",
@@ -76,15 +106,19 @@ def get_stops_along_route(distance, duration, current_cycle_used, coordinates):
         dist_to_mandatory_break = time_to_mandatory_break * avg_speed
         dist_to_70h_limit = time_to_70h_limit * avg_speed # Approx, as cycle includes non-driving duty
 
-        # Determine the next driving segment distance (minimum of all constraints)
-        max_drive_dist_this_segment = min(
-            remaining_distance,
-            dist_to_11h_limit,
-            dist_to_14h_limit, # Check this constraint carefully
-            dist_to_mandatory_break,
-            dist_to_70h_limit, # Check this constraint carefully
-            FUEL_STOP_INTERVAL # Distance until potential fuel stop
-        )
+        # Determine the next driving segment distance (minimum of all constraints),
+        # written out as comparisons since this runs once per segment
+        max_drive_dist_this_segment = remaining_distance
+        if dist_to_11h_limit < max_drive_dist_this_segment:
+            max_drive_dist_this_segment = dist_to_11h_limit
+        if dist_to_14h_limit < max_drive_dist_this_segment: # Check this constraint carefully
+            max_drive_dist_this_segment = dist_to_14h_limit
+        if dist_to_mandatory_break < max_drive_dist_this_segment:
+            max_drive_dist_this_segment = dist_to_mandatory_break
+        if dist_to_70h_limit < max_drive_dist_this_segment: # Check this constraint carefully
+            max_drive_dist_this_segment = dist_to_70h_limit
+        if FUEL_STOP_INTERVAL < max_drive_dist_this_segment: # Distance until potential fuel stop
+            max_drive_dist_this_segment = FUEL_STOP_INTERVAL
 
         # Ensure we don't drive negative distance if a limit is already hit
         if max_drive_dist_this_segment <= 0:
@@ -101,7 +135,7 @@ def get_stops_along_route(distance, duration, current_cycle_used, coordinates):
                  reset_shift = False
              else:
                  # Should ideally not happen with positive remaining_distance, maybe handle error
-                 print("Warning: Cannot drive but no specific limit hit.")
+                 logger.warning("Cannot drive but no specific limit hit.")
                  # Force a short break as a fallback? Or handle error appropriately.
                  stop_reason = "Forced Check/Break"
                  stop_duration = 0.1 # Minimal duration
@@ -141,9 +175,9 @@ def get_stops_along_route(distance, duration, current_cycle_used, coordinates):
         elapsed_trip_time += driving_segment_time
         remaining_distance -= max_drive_dist_this_segment
 
-        # Update current position (approximate)
-        segment_coord_count = int((max_drive_dist_this_segment / distance) * len(coordinates)) if distance > 0 else 0
-        current_position_index += segment_coord_count
+        # Update current position along the polyline
+        miles_driven += max_drive_dist_this_segment
+        current_position_index = bisect_left(cumulative_miles, miles_driven * polyline_miles_per_route_mile)
         current_position_index = min(current_position_index, len(coordinates) - 1) # Ensure bounds
 
 
@@ -218,20 +252,50 @@ def get_stops_along_route(distance, duration, current_cycle_used, coordinates):
 
     return stops
 
+def get_directions(pickup, dropoff):
+    """
+    Fetches driving directions between two [lng, lat] points from ORS.
+
+    Responses are cached per (pickup, dropoff, profile), since fleets keep revisiting
+    the same depots and each ORS call is a slow, rate-limited network hop. Only the
+    fields the route planner uses are kept.
+
+    Returns:
+        dict with "distance" (miles), "duration" (hours) and "coordinates", or None
+    """
+    cache = caches['directions']
+    cache_key = "ors:" + hashlib.md5(f"{pickup}|{dropoff}|{ORS_PROFILE}".encode()).hexdigest()
+    directions = cache.get(cache_key)
+    if directions is not None:
+        return directions
+
+    route = client.directions([pickup, dropoff], profile=ORS_PROFILE, format='geojson')
+
+    if not route:
+        return None
+
+    segment = route['features'][0]['properties']['segments'][0]
+    directions = {
+        "distance": segment['distance'] / 1609.34,  # Convert to miles
+        "duration": segment['duration'] / 3600,     # Convert to hours
+        "coordinates": route['features'][0]['geometry']['coordinates'],
+    }
+    cache.set(cache_key, directions, DIRECTIONS_CACHE_TIMEOUT)
+    return directions
+
 def get_route_details(pickup_coords, dropoff_coords, current_cycle_used):
     pickup = [float(pickup_coords.split(',')[1]), float(pickup_coords.split(',')[0])]
     dropoff = [float(dropoff_coords.split(',')[1]), float(dropoff_coords.split(',')[0])]
     
-    coords = [pickup, dropoff]
-    route = client.directions(coords, profile='driving-car', format='geojson')
+    directions = get_directions(pickup, dropoff)
     
-    if not route:
+    if not directions:
         return None
     
     # Extract route information
-    distance = route['features'][0]['properties']['segments'][0]['distance'] / 1609.34  # Convert to miles
-    duration = route['features'][0]['properties']['segments'][0]['duration'] / 3600     # Convert to hours
-    coordinates = route['features'][0]['geometry']['coordinates']
+    distance = directions['distance']
+    duration = directions['duration']
+    coordinates = directions['coordinates']
     
     # Get stops based on HOS regulations
     stops = get_stops_along_route(distance, duration, current_cycle_used, coordinates)
@@ -244,6 +308,18 @@ def get_route_details(pickup_coords, dropoff_coords, current_cycle_used):
         
     }
 
+# ELD event type logged for each stop reason produced by get_stops_along_route
+STOP_REASON_TO_EVENT_TYPE = {
+    "Pickup": 'on_duty',
+    "Delivery": 'on_duty',
+    "Fueling": 'on_duty',
+    # Could be 'off_duty', 'sleeper_berth', or 'on_duty' depending on driver action/policy
+    # Defaulting to 'off_duty' here, might need adjustment or driver input later
+    "30-Minute Break": 'off_duty',
+    # Could be 'off_duty' or 'sleeper_berth'; consider 'sleeper_berth' if the vehicle has one
+    "10-Hour Rest Period": 'off_duty',
+}
+
 def create_route_for_trip(trip: Trip):
     """
     Create a route for the given trip using the trip's coordinates and cycle information,
@@ -263,26 +339,10 @@ def create_route_for_trip(trip: Trip):
     )
 
     if not route_data or not route_data.get("stops"):
-        print(f"Could not generate route or stops for Trip {trip.id}")
+        logger.warning("Could not generate route or stops for Trip %s", trip.id)
         return None # Cannot proceed without route data and stops
 
-    # --- 2. Create and Save the Route Object ---
-    try:
-        route = Route.objects.create(
-            trip=trip,
-            distance=route_data["distance"],
-            duration=route_data["duration"],
-            # Ensure route_polyline is stored correctly (e.g., as JSON string or text)
-            route_polyline=str(route_data["route_polyline"]),
-            # Ensure stops are stored correctly (e.g., as JSON)
-            stops=route_data["stops"]
-        )
-    except Exception as e:
-        print(f"Error saving Route for Trip {trip.id}: {e}")
-        return None
-
-
-    # --- 3. Generate Initial ELD Logs from Stops ---
+    # --- 2. Generate Initial ELD Logs from Stops ---
     # Use trip.startDate as the absolute reference point
     # Note: Assumes trip.startDate is set correctly when the trip is created/started.
     # If routing is done before the trip starts, adjust timing logic accordingly.
@@ -293,6 +353,9 @@ def create_route_for_trip(trip: Trip):
     # ELDLog.objects.filter(trip=trip, auto_generated=True).delete() # Optional: Add an 'auto_generated' flag
 
     stops = route_data["stops"]
+    # Built in memory and written with a single bulk_create below. bulk_create skips
+    # ELDLog.save(), so the denormalized driver is set here explicitly.
+    eld_logs = []
 
     for i, stop in enumerate(stops):
         stop_start_elapsed = stop['elapsed_time']
@@ -306,8 +369,9 @@ def create_route_for_trip(trip: Trip):
         if driving_duration > 0.001: # Avoid tiny/zero driving logs
             drive_start_time = current_log_time
             drive_end_time = drive_start_time + timedelta(hours=driving_duration)
-            ELDLog.objects.create(
+            eld_logs.append(ELDLog(
                 trip=trip,
+                driver_id=trip.driver_id,
                 event_type='driving',
                 start_time=drive_start_time,
                 end_time=drive_end_time,
@@ -315,7 +379,7 @@ def create_route_for_trip(trip: Trip):
                 location="En Route", # Generic location for driving
                 # coordinates=... # Could try interpolating coordinates
                 # auto_generated=True # Optional flag
-            )
+            ))
             current_log_time = drive_end_time # Update current time
 
         # --- b) Log the Stop Event itself ---
@@ -323,25 +387,11 @@ def create_route_for_trip(trip: Trip):
         log_end_time = log_start_time + timedelta(hours=stop_duration)
 
         # Map stop reason to ELD event type
-        event_type = 'off_duty' # Default
-        if stop_reason == "Pickup":
-            event_type = 'on_duty'
-        elif stop_reason == "Delivery":
-            event_type = 'on_duty'
-        elif stop_reason == "Fueling":
-            event_type = 'on_duty'
-        elif stop_reason == "30-Minute Break":
-            # Could be 'off_duty', 'sleeper_berth', or 'on_duty' depending on driver action/policy
-            # Defaulting to 'off_duty' here, might need adjustment or driver input later
-            event_type = 'off_duty'
-        elif stop_reason == "10-Hour Rest Period":
-            # Could be 'off_duty' or 'sleeper_berth'
-            # Defaulting to 'off_duty' here
-            event_type = 'off_duty'
-            # Consider adding logic for 'sleeper_berth' if the vehicle has one
-
-        ELDLog.objects.create(
+        event_type = STOP_REASON_TO_EVENT_TYPE.get(stop_reason, 'off_duty') # Default off_duty
+
+        eld_logs.append(ELDLog(
             trip=trip,
+            driver_id=trip.driver_id,
             event_type=event_type,
             start_time=log_start_time,
             end_time=log_end_time,
@@ -349,11 +399,29 @@ def create_route_for_trip(trip: Trip):
             location=stop_location,
             coordinates=str(stop_coords), # Store coordinates as string or parse appropriately
             # auto_generated=True # Optional flag
-        )
+        ))
 
         current_log_time = log_end_time # Update current time
         last_elapsed_time = stop_start_elapsed + stop_duration # Update elapsed time marker
 
+    # --- 3. Save the Route and ELD Logs in One Transaction ---
+    try:
+        with transaction.atomic():
+            route = Route.objects.create(
+                trip=trip,
+                distance=route_data["distance"],
+                duration=route_data["duration"],
+                route_polyline=encode_polyline(route_data["route_polyline"]),
+                # Ensure stops are stored correctly (e.g., as JSON)
+                stops=route_data["stops"]
+            )
+            ELDLog.objects.bulk_create(eld_logs, batch_size=200)
+    except Exception:
+        logger.exception("Error saving Route and ELD logs for Trip %s", trip.id)
+        return None
+
+    # bulk_create does not send post_save, so drop the driver's cached HOS status here
+    invalidate_hos_status(trip.driver_id)
 
-    print(f"Successfully created Route and initial ELD logs for Trip {trip.id}")
+    logger.info("Successfully created Route and initial ELD logs for Trip %s", trip.id)
     return route
@@ -1,3 +1,68 @@
-from django.test import TestCase
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TransactionTestCase
 
-# Create your tests here.
+from .polyline import encode_polyline, decode_polyline
+
+# Reference example from Google's encoded polyline format documentation, as [lng, lat]
+GOOGLE_COORDINATES = [[-120.2, 38.5], [-120.95, 40.7], [-126.453, 43.252]]
+GOOGLE_POLYLINE = '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+
+
+class PolylineTests(SimpleTestCase):
+    def test_encode_matches_reference(self):
+        self.assertEqual(encode_polyline(GOOGLE_COORDINATES), GOOGLE_POLYLINE)
+
+    def test_decode_matches_reference(self):
+        self.assertEqual(decode_polyline(GOOGLE_POLYLINE), GOOGLE_COORDINATES)
+
+    def test_round_trip(self):
+        coordinates = [[-87.62979, 41.87811], [-87.6298, 41.87811], [-104.99025, 39.73915], [0.0, 0.0], [-0.00001, 0.00001]]
+        self.assertEqual(decode_polyline(encode_polyline(coordinates)), coordinates)
+
+    def test_empty(self):
+        self.assertEqual(encode_polyline([]), '')
+        self.assertEqual(decode_polyline(''), [])
+
+
+class EncodeRoutePolylineMigrationTests(TransactionTestCase):
+    migrate_from = ('routing', '0001_initial')
+    migrate_to = ('routing', '0002_encode_route_polyline')
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([target])
+        return executor.loader.project_state([target]).apps
+
+    def create_route(self, apps, username, route_polyline):
+        User = apps.get_model('authentication', 'User')
+        Trip = apps.get_model('tracking', 'Trip')
+        Route = apps.get_model('routing', 'Route')
+        trip = Trip.objects.create(
+            driver=User.objects.create(username=username),
+            current_location='Chicago, IL',
+            pickup_location='Chicago, IL',
+            dropoff_location='Denver, CO',
+            current_cycle_used=0,
+        )
+        return Route.objects.create(trip=trip, distance=0, duration=0, route_polyline=route_polyline).pk
+
+    def test_forward_and_backward(self):
+        apps = self.migrate(self.migrate_from)
+        legacy_pk = self.create_route(apps, 'legacy', str(GOOGLE_COORDINATES))
+        # Rows that already hold an encoded polyline are left alone
+        encoded_pk = self.create_route(apps, 'encoded', GOOGLE_POLYLINE)
+
+        apps = self.migrate(self.migrate_to)
+        Route = apps.get_model('routing', 'Route')
+        self.assertEqual(Route.objects.get(pk=legacy_pk).route_polyline, GOOGLE_POLYLINE)
+        self.assertEqual(Route.objects.get(pk=encoded_pk).route_polyline, GOOGLE_POLYLINE)
+
+        apps = self.migrate(self.migrate_from)
+        Route = apps.get_model('routing', 'Route')
+        self.assertEqual(Route.objects.get(pk=legacy_pk).route_polyline, str(GOOGLE_COORDINATES))
+        self.assertEqual(Route.objects.get(pk=encoded_pk).route_polyline, str(GOOGLE_COORDINATES))
+
+        # Leave the schema fully migrated for the tests that run after this one
+        self.migrate(self.migrate_to)
@@ -6,10 +6,15 @@ from .models import Route
 from .serializers import RouteSerializer
 from tracking.models import Trip
 from .services import get_route_details
+from .polyline import encode_polyline
 
 class GenerateRouteView(APIView):
     def post(self, request, trip_id):
-        trip = get_object_or_404(Trip, id=trip_id)
+        # Only the columns used for routing (and trip_title in the response) are loaded
+        trip = get_object_or_404(
+            Trip.objects.only('id', 'title', 'pickup_coordinates', 'dropoff_coordinates', 'current_cycle_used'),
+            id=trip_id
+        )
         
         # Extract coordinates from trip
         pickup_coords = trip.pickup_coordinates
@@ -22,6 +27,7 @@ class GenerateRouteView(APIView):
             return Response({"error": "Could not generate route"}, status=400)
         
         # Save to database
+        route_data["route_polyline"] = encode_polyline(route_data["route_polyline"])
         route = Route.objects.create(trip=trip, **route_data)
         
         return Response(RouteSerializer(route).data, status=201)
@@ -113,6 +113,34 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# The default cache must be shared by every gunicorn worker / serverless instance so
+# they see each other's invalidations: set REDIS_URL in production. Without it each
+# process falls back to its own LocMemCache, which is only meant for development.
+# ORS directions are kept in the database instead: a row lookup is far cheaper than
+# the API call it saves. Its table is created by `manage.py createcachetable`
+# (see build_files.sh).
+
+REDIS_URL = os.environ.get('REDIS_URL')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'directions': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
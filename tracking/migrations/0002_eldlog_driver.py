@@ -0,0 +1,40 @@
+# Generated by Django 4.2.20 on 2026-10-15 22:11
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def populate_eldlog_driver(apps, schema_editor):
+    ELDLog = apps.get_model('tracking', 'ELDLog')
+    Trip = apps.get_model('tracking', 'Trip')
+    ELDLog.objects.filter(driver__isnull=True).update(
+        driver=Subquery(Trip.objects.filter(pk=OuterRef('trip_id')).values('driver_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tracking', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eldlog',
+            name='driver',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='eld_logs', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(populate_eldlog_driver, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='eldlog',
+            name='driver',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='eld_logs', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='eldlog',
+            index=models.Index(fields=['driver', 'start_time'], name='tracking_el_driver__f1b82d_idx'),
+        ),
+    ]
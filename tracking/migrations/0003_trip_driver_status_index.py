@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-15 22:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0002_eldlog_driver'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['driver', 'status'], name='tracking_tr_driver__42dc83_idx'),
+        ),
+    ]
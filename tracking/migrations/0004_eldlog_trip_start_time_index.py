@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-15 22:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0003_trip_driver_status_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eldlog',
+            index=models.Index(fields=['trip', '-start_time'], name='tracking_el_trip_id_4e08cd_idx'),
+        ),
+    ]
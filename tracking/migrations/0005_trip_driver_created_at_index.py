@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-15 22:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0004_eldlog_trip_start_time_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['driver', '-created_at'], name='tracking_tr_driver__168183_idx'),
+        ),
+    ]
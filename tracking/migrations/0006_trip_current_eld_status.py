@@ -0,0 +1,37 @@
+# Generated by Django 4.2.20 on 2026-10-15 22:28
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+
+def populate_current_eld_status(apps, schema_editor):
+    # Same rule as tracking.services.sync_current_eld_status: the latest log that has
+    # already started, so logs planned ahead by route generation are skipped. Trips
+    # that haven't started stay NULL, as TripCreateView leaves them.
+    ELDLog = apps.get_model('tracking', 'ELDLog')
+    Trip = apps.get_model('tracking', 'Trip')
+    Trip.objects.filter(status='in_progress').update(
+        current_eld_status=Subquery(
+            ELDLog.objects.filter(
+                trip_id=OuterRef('pk'),
+                start_time__lte=timezone.now()
+            ).order_by('-start_time').values('event_type')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0005_trip_driver_created_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='current_eld_status',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.RunPython(populate_current_eld_status, migrations.RunPython.noop),
+    ]
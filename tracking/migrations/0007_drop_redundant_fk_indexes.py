@@ -0,0 +1,26 @@
+# Generated by Django 4.2.20 on 2026-10-15 22:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tracking', '0006_trip_current_eld_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='eldlog',
+            name='trip',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='eld_logs', to='tracking.trip'),
+        ),
+        migrations.AlterField(
+            model_name='trip',
+            name='driver',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
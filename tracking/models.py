@@ -12,7 +12,8 @@ class Trip(models.Model):
         ('cancelled', 'Cancelled'),
     ]
 
-    driver = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Lookups by driver are served by the (driver, ...) composite indexes below
+    driver = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     title = models.CharField(max_length=100, default="Trip")
     description = models.TextField(blank=True, null=True)
     current_location = models.CharField(max_length=255)
@@ -23,6 +24,10 @@ class Trip(models.Model):
     dropoff_coordinates = models.CharField(max_length=255, default="0.0,0.0")
     current_cycle_used = models.FloatField(help_text="Hours used from 70hr/8day cycle")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='planned')
+    # Event type of the driver's active ELD log (the latest one already started), set
+    # once the trip starts and kept in step by the tracking views, so repeated status
+    # submissions don't need a log lookup. NULL until the trip is started.
+    current_eld_status = models.CharField(max_length=50, null=True, blank=True)
     startDate = models.DateTimeField(default=timezone.now)
     estimatedEndDate = models.DateTimeField(null=True, blank=True)
     actual_end_date = models.DateTimeField(null=True, blank=True)
@@ -37,6 +42,10 @@ class Trip(models.Model):
         return hasattr(self, 'route')
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['driver', 'status']),
+            models.Index(fields=['driver', '-created_at']),
+        ]
 
 
 class Stop(models.Model):
@@ -81,7 +90,11 @@ class ELDLog(models.Model):
         ('off_duty', 'Off Duty'),
     ]
     
-    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name="eld_logs")
+    # Lookups by trip are served by the (trip, -start_time) index below
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name="eld_logs", db_index=False)
+    # Denormalized from trip.driver so HOS lookups can range-scan (driver, start_time)
+    # without joining through Trip. Filled in from the trip on save.
+    driver = models.ForeignKey(User, on_delete=models.CASCADE, related_name="eld_logs", db_index=False)
     event_type = models.CharField(max_length=50, choices=EVENT_TYPE_CHOICES)
     location = models.CharField(max_length=255, null=True, blank=True)
     coordinates = models.CharField(max_length=255, null=True, blank=True)
@@ -92,5 +105,14 @@ class ELDLog(models.Model):
     def __str__(self):
         return f"{self.trip.title} - {self.event_type} - {self.start_time}"
 
+    def save(self, *args, **kwargs):
+        if self.driver_id is None:
+            self.driver_id = self.trip.driver_id
+        super().save(*args, **kwargs)
+
     class Meta:
-        ordering = ['start_time']
\ No newline at end of file
+        ordering = ['start_time']
+        indexes = [
+            models.Index(fields=['driver', 'start_time']),
+            models.Index(fields=['trip', '-start_time']),
+        ]
@@ -1,10 +1,8 @@
 # serializers.py
 from rest_framework import serializers
 from .models import Trip, Stop, GPSLog, ELDLog
-from routing.serializers import RouteSerializer
 
 try:
-   
     from routing.serializers import RouteSerializer
 except ImportError:
     RouteSerializer = None 
@@ -18,6 +16,7 @@ class ELDLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = ELDLog
         fields = '__all__'
+        read_only_fields = ['driver']
 
 class StopSerializer(serializers.ModelSerializer):
     class Meta:
@@ -26,8 +25,8 @@ class StopSerializer(serializers.ModelSerializer):
 
 class TripSerializer(serializers.ModelSerializer):
     
-    stops = serializers.SerializerMethodField(read_only=True)
-    eld_logs = serializers.SerializerMethodField(read_only=True)
+    stops = StopSerializer(many=True, read_only=True)
+    eld_logs = ELDLogSerializer(many=True, read_only=True)
     has_route = serializers.ReadOnlyField() 
 
     
@@ -67,11 +66,3 @@ class TripSerializer(serializers.ModelSerializer):
             'estimatedEndDate': {'required': False},
              'status': {'required': False},
         }
-        
-    def get_stops(self, obj):
-       
-        return []
-        
-    def get_eld_logs(self, obj):
-    
-        return []
\ No newline at end of file
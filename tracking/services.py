@@ -0,0 +1,18 @@
+from django.db.models import Subquery
+from django.utils import timezone
+from .models import Trip, ELDLog
+
+def sync_current_eld_status(trip_id):
+    """
+    Re-derive a trip's current_eld_status, in one UPDATE, from the latest of its
+    ELD logs that has already started. Logs planned ahead by route generation
+    start in the future and so don't count as the current status.
+    """
+    Trip.objects.filter(pk=trip_id).update(
+        current_eld_status=Subquery(
+            ELDLog.objects.filter(
+                trip_id=trip_id,
+                start_time__lte=timezone.now()
+            ).order_by('-start_time').values('event_type')[:1]
+        )
+    )
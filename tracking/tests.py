@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from authentication.models import User
+
+from .models import ELDLog, Trip
+
+
+class TrackingTestCase(TestCase):
+    def setUp(self):
+        self.driver = User.objects.create_user(username='driver', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.driver)
+        self.trip = Trip.objects.create(
+            driver=self.driver,
+            current_location='Chicago, IL',
+            pickup_location='Chicago, IL',
+            dropoff_location='Denver, CO',
+            current_cycle_used=0,
+        )
+
+    def log(self, event_type, start_time, end_time=None):
+        duration = (end_time - start_time).total_seconds() / 3600 if end_time else 0
+        return ELDLog.objects.create(
+            trip=self.trip,
+            event_type=event_type,
+            duration=duration,
+            start_time=start_time,
+            end_time=end_time,
+        )
+
+
+class DailyELDLogViewTests(TrackingTestCase):
+    def get_logs(self, date_str):
+        return self.client.get(reverse('daily_eld_logs', args=[self.trip.id, date_str]))
+
+    def test_includes_overlapping_logs_from_before_midnight(self):
+        midnight = datetime(2025, 3, 9, tzinfo=dt_timezone.utc)
+        # The on-duty log runs past midnight; the later off-duty log inside it doesn't
+        self.log('on_duty', midnight - timedelta(hours=5), midnight + timedelta(hours=3))
+        self.log('off_duty', midnight - timedelta(hours=2), midnight - timedelta(hours=1))
+        self.log('driving', midnight + timedelta(hours=8), midnight + timedelta(hours=10))
+        self.log('off_duty', midnight + timedelta(days=1), midnight + timedelta(days=1, hours=10))
+
+        response = self.get_logs('2025-03-09')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([log['event_type'] for log in response.data], ['on_duty', 'driving'])
+
+    def test_includes_open_log(self):
+        midnight = datetime(2025, 3, 9, tzinfo=dt_timezone.utc)
+        self.log('sleeper_berth', midnight - timedelta(hours=2))
+
+        response = self.get_logs('2025-03-09')
+
+        self.assertEqual([log['event_type'] for log in response.data], ['sleeper_berth'])
+
+    def test_rejects_non_calendar_dates(self):
+        for date_str in ['20250309', '2025-W10-7', '2025-02-30']:
+            with self.subTest(date_str=date_str):
+                self.assertEqual(self.get_logs(date_str).status_code, 400)
+
+
+class ChangeELDStatusViewTests(TrackingTestCase):
+    def change_status(self, new_status):
+        return self.client.post(
+            reverse('change_eld_status', args=[self.trip.id]), {'new_status': new_status}, format='json'
+        )
+
+    def test_planned_future_log_does_not_block_status_changes(self):
+        # Route generation plans logs ahead of time, starting in the future
+        planned_start = timezone.now() + timedelta(hours=5)
+        planned_log = self.log('on_duty', planned_start, planned_start + timedelta(hours=1))
+        self.assertEqual(self.client.post(reverse('start_trip', args=[self.trip.id])).status_code, 200)
+
+        self.assertEqual(self.change_status('driving').status_code, 201)
+        response = self.change_status('on_duty')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['event_type'], 'on_duty')
+        self.trip.refresh_from_db()
+        self.assertEqual(self.trip.current_eld_status, 'on_duty')
+        # The driving log is closed; the planned log is untouched
+        driving_log = self.trip.eld_logs.get(event_type='driving')
+        self.assertIsNotNone(driving_log.end_time)
+        planned_log.refresh_from_db()
+        self.assertEqual(planned_log.start_time, planned_start)
+
+    def test_resent_status_is_not_duplicated(self):
+        self.client.post(reverse('start_trip', args=[self.trip.id]))
+
+        response = self.change_status('on_duty')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.trip.eld_logs.count(), 1)
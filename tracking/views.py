@@ -1,13 +1,83 @@
 # views.py
+import logging
+import re
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.pagination import CursorPagination
 from django.utils import timezone
+from django.db import transaction
+from django.db.models import Q
 from .models import Trip, Stop, GPSLog, ELDLog
-from .serializers import TripSerializer, StopSerializer, GPSLogSerializer, ELDLogSerializer
+from .serializers import TripSerializer, GPSLogSerializer, ELDLogSerializer
+from .services import sync_current_eld_status
 from routing.services import create_route_for_trip 
+from compliance.services import CYCLE_DAYS
 from django.shortcuts import get_object_or_404
-from datetime import datetime, time, timedelta 
+from django.http import Http404
+from datetime import date, datetime, time, timedelta 
+
+logger = logging.getLogger(__name__)
+
+# date.fromisoformat also accepts other ISO forms on Python 3.11+ (20250101, 2025-W01-1)
+_DATE_PATH_RE = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}')
+
+# A day of ELD activity never realistically gets near this many entries
+MAX_DAILY_ELD_LOGS = 500
+
+_VALID_ELD_STATUSES = frozenset(choice[0] for choice in ELDLog.EVENT_TYPE_CHOICES)
+_VALID_ELD_STATUSES_STR = ", ".join(choice[0] for choice in ELDLog.EVENT_TYPE_CHOICES)
+
+
+# Write endpoints answer with the instance they just saved. Building those payloads
+# directly skips a ModelSerializer pass per response; each helper mirrors the
+# output of the matching serializer in serializers.py (fields='__all__').
+
+def _datetime_to_str(value):
+    """Same rendering as DRF's DateTimeField: ISO 8601 in the current time zone, UTC as 'Z'."""
+    if value is None:
+        return None
+    value = timezone.localtime(value).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+def _eld_to_dict(log):
+    return {
+        'id': log.id,
+        'event_type': log.event_type,
+        'location': log.location,
+        'coordinates': log.coordinates,
+        'duration': float(log.duration),
+        'start_time': _datetime_to_str(log.start_time),
+        'end_time': _datetime_to_str(log.end_time),
+        'trip': log.trip_id,
+        'driver': log.driver_id,
+    }
+
+def _gps_to_dict(gps_log):
+    return {
+        'id': gps_log.id,
+        'latitude': float(gps_log.latitude),
+        'longitude': float(gps_log.longitude),
+        'speed': None if gps_log.speed is None else float(gps_log.speed),
+        'timestamp': _datetime_to_str(gps_log.timestamp),
+        'trip': gps_log.trip_id,
+    }
+
+def _stop_to_dict(stop):
+    return {
+        'id': stop.id,
+        'location': stop.location,
+        'coordinates': stop.coordinates,
+        'reason': stop.reason,
+        'duration': float(stop.duration),
+        'elapsed_trip_time': float(stop.elapsed_trip_time),
+        'planned_arrival_time': _datetime_to_str(stop.planned_arrival_time),
+        'actual_arrival_time': _datetime_to_str(stop.actual_arrival_time),
+        'completed': stop.completed,
+        'trip': stop.trip_id,
+    }
 
 class TripCreateView(generics.CreateAPIView):
     queryset = Trip.objects.all()
@@ -21,24 +91,29 @@ class TripCreateView(generics.CreateAPIView):
         trip = serializer.save(driver=request.user)
         
         route = create_route_for_trip(trip)
-        
-        response_data = serializer.data
-        
         if route:
-            from routing.serializers import RouteSerializer
-            route_data = RouteSerializer(route).data
-            response_data['route'] = route_data
+            # TripSerializer nests the route itself, so one pass renders the whole response
+            trip.route = route
         
-        headers = self.get_success_headers(serializer.data)
-        return Response(response_data, status=status.HTTP_201_CREATED, headers=headers)
+        data = serializer.data
+        headers = self.get_success_headers(data)
+        return Response(data, status=status.HTTP_201_CREATED, headers=headers)
+
+class TripCursorPagination(CursorPagination):
+    # Seeks on (driver, -created_at) instead of OFFSET, so deep pages cost the same as the first
+    ordering = '-created_at'
+    page_size = 20
 
 class TripListView(generics.ListAPIView):
     serializer_class = TripSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TripCursorPagination
 
     def get_queryset(self):
         status_filter = self.request.query_params.get('status', None)
-        queryset = Trip.objects.filter(driver=self.request.user).select_related('route')
+        queryset = Trip.objects.filter(driver=self.request.user).select_related(
+            'route', 'driver'
+        ).prefetch_related('stops', 'eld_logs').order_by('-created_at')
         
         if status_filter:
             queryset = queryset.filter(status=status_filter)
@@ -69,18 +144,25 @@ class StartTripView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request, pk):
-        try:
-            trip = Trip.objects.get(pk=pk, driver=request.user)
-            
-            if trip.status != 'planned':
+        trip = get_object_or_404(Trip, pk=pk, driver=request.user)
+        
+        if trip.status != 'planned':
+            return Response({"error": "Only planned trips can be started"}, 
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        now = timezone.now()
+        with transaction.atomic():
+            # Conditional UPDATE so two concurrent starts can't both succeed
+            started = Trip.objects.filter(pk=trip.pk, status='planned').update(
+                status='in_progress', startDate=now, current_eld_status='on_duty', updated_at=now
+            )
+            if not started:
                 return Response({"error": "Only planned trips can be started"}, 
                                 status=status.HTTP_400_BAD_REQUEST)
-            
-            
             trip.status = 'in_progress'
-            trip.startDate = timezone.now()
-            trip.save()
-            
+            trip.startDate = now
+            trip.current_eld_status = 'on_duty'
+            trip.updated_at = now
             
             ELDLog.objects.create(
                 trip=trip,
@@ -88,72 +170,59 @@ class StartTripView(APIView):
                 location=trip.pickup_location,
                 coordinates=trip.pickup_coordinates,
                 duration=1.0,  # 1 hour for pickup
-                start_time=timezone.now()
+                start_time=now
             )
-            
-            return Response(TripSerializer(trip).data)
-            
-        except Trip.DoesNotExist:
-            return Response({"error": "Trip not found"}, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response(TripSerializer(trip).data)
 
 class LogELDEventView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request, pk):
-        try:
-            trip = Trip.objects.get(pk=pk, driver=request.user)
-            
-            if trip.status != 'in_progress':
-                return Response({"error": "Trip must be in progress to log ELD events"}, 
-                                status=status.HTTP_400_BAD_REQUEST)
-            
-            serializer = ELDLogSerializer(data=request.data)
-            if serializer.is_valid():
-                serializer.save(trip=trip)
-                return Response(serializer.data, status=status.HTTP_201_CREATED)
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-            
-        except Trip.DoesNotExist:
-            return Response({"error": "Trip not found"}, status=status.HTTP_404_NOT_FOUND)
+        # driver is read by ELDLog.save() to denormalize the log's driver
+        trip = get_object_or_404(Trip.objects.only('id', 'status', 'driver'), pk=pk, driver=request.user)
+        
+        if trip.status != 'in_progress':
+            return Response({"error": "Trip must be in progress to log ELD events"}, 
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        serializer = ELDLogSerializer(data=request.data)
+        if serializer.is_valid():
+            with transaction.atomic():
+                eld_log = serializer.save(trip=trip)
+                # The logged event may be backdated, so the trip's status follows whichever log is now latest
+                sync_current_eld_status(trip.id)
+            return Response(_eld_to_dict(eld_log), status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class LogGPSView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request, pk):
-        try:
-            trip = Trip.objects.get(pk=pk, driver=request.user)
-            
-            if trip.status != 'in_progress':
-                return Response({"error": "Trip must be in progress to log GPS data"}, 
-                                status=status.HTTP_400_BAD_REQUEST)
-            
-            serializer = GPSLogSerializer(data=request.data)
-            if serializer.is_valid():
-                serializer.save(trip=trip)
-                return Response(serializer.data, status=status.HTTP_201_CREATED)
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-            
-        except Trip.DoesNotExist:
-            return Response({"error": "Trip not found"}, status=status.HTTP_404_NOT_FOUND)
+        trip = get_object_or_404(Trip.objects.only('id', 'status'), pk=pk, driver=request.user)
+        
+        if trip.status != 'in_progress':
+            return Response({"error": "Trip must be in progress to log GPS data"}, 
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        serializer = GPSLogSerializer(data=request.data)
+        if serializer.is_valid():
+            gps_log = serializer.save(trip=trip)
+            return Response(_gps_to_dict(gps_log), status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class CompleteStopView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request, pk, stop_id):
-        try:
-            trip = Trip.objects.get(pk=pk, driver=request.user)
-            stop = Stop.objects.get(pk=stop_id, trip=trip)
-            
-            stop.completed = True
-            stop.actual_arrival_time = timezone.now()
-            stop.save()
-            
-            return Response(StopSerializer(stop).data)
-            
-        except Trip.DoesNotExist:
-            return Response({"error": "Trip not found"}, status=status.HTTP_404_NOT_FOUND)
-        except Stop.DoesNotExist:
-            return Response({"error": "Stop not found"}, status=status.HTTP_404_NOT_FOUND)
+        # Ownership is checked through the join, so the trip itself is never loaded
+        stop = get_object_or_404(Stop, pk=stop_id, trip_id=pk, trip__driver=request.user)
+        
+        stop.completed = True
+        stop.actual_arrival_time = timezone.now()
+        stop.save(update_fields=['completed', 'actual_arrival_time'])
+        
+        return Response(_stop_to_dict(stop))
 
 
 class DailyELDLogView(APIView):
@@ -176,21 +245,30 @@ class DailyELDLogView(APIView):
             A Response object containing the serialized ELD log data or an error.
         """
         try:
-            target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            if not _DATE_PATH_RE.fullmatch(date_str):
+                raise ValueError(date_str)
+            target_date = date.fromisoformat(date_str)
         except ValueError:
             return Response({"error": "Invalid date format. Use YYYY-MM-DD."},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        trip = get_object_or_404(Trip, pk=trip_id, driver=request.user)
+        trip = get_object_or_404(Trip.objects.only('id'), pk=trip_id, driver=request.user)
 
+        # Half-open [start, start + 1 day) so the last microsecond of the day isn't dropped
         start_datetime = timezone.make_aware(datetime.combine(target_date, time.min))
-        end_datetime = timezone.make_aware(datetime.combine(target_date, time.max))
+        end_datetime = start_datetime + timedelta(days=1)
       
+        # Every log overlapping the day, including ones that started earlier and run
+        # past midnight (logs can overlap, so that may be more than the latest one).
+        # Start times are bounded below by the HOS cycle window so the (trip, -start_time)
+        # index seek stays bounded; no single duty status runs longer than that.
         logs = ELDLog.objects.filter(
             trip=trip,
-            start_time__lt=end_datetime, 
-            end_time__gt=start_datetime 
-        ).order_by('start_time') 
+            start_time__gte=start_datetime - timedelta(days=CYCLE_DAYS),
+            start_time__lt=end_datetime
+        ).filter(
+            Q(end_time__gt=start_datetime) | Q(end_time__isnull=True)
+        ).order_by('start_time')[:MAX_DAILY_ELD_LOGS]
 
         serializer = self.serializer_class(logs, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -215,73 +293,91 @@ class ChangeELDStatusView(APIView):
             "remarks": "Optional: Any remarks"
         }
         """
-        trip = get_object_or_404(Trip, pk=trip_id, driver=request.user)
+        new_status = request.data.get('new_status')
+        new_log_entry = None
+
+        # Unlocked pre-check: invalid requests and re-sent statuses are answered
+        # without waiting behind the row lock that real transitions take below
+        trip = get_object_or_404(
+            Trip.objects.only('id', 'status', 'current_eld_status'),
+            pk=trip_id, driver=request.user
+        )
         if trip.status != 'in_progress':
              return Response({"error": "Trip must be in progress to change ELD status."},
                              status=status.HTTP_400_BAD_REQUEST)
 
-        new_status = request.data.get('new_status')
-        location = request.data.get('location', trip.current_location) 
-        coordinates = request.data.get('coordinates', trip.current_coordinates)
-        remarks = request.data.get('remarks', '') 
-
-        valid_statuses = [choice[0] for choice in ELDLog.EVENT_TYPE_CHOICES]
-        if new_status not in valid_statuses:
-            return Response({"error": f"Invalid status. Choose from: {', '.join(valid_statuses)}"},
+        if new_status not in _VALID_ELD_STATUSES:
+            return Response({"error": f"Invalid status. Choose from: {_VALID_ELD_STATUSES_STR}"},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        now = timezone.now()
-        new_log_entry = None
+        if trip.current_eld_status == new_status:
+            return Response({"message": f"Status is already '{new_status}'."}, status=status.HTTP_200_OK)
 
         try:
-            latest_log = ELDLog.objects.filter(trip=trip).latest('start_time')
-
-            if latest_log.event_type == new_status:
-                 return Response({"message": f"Status is already '{new_status}'."}, status=status.HTTP_200_OK)
-
-            if latest_log.end_time is None:
-                latest_log.end_time = now
-                duration_delta = now - latest_log.start_time
-                latest_log.duration = duration_delta.total_seconds() / 3600 
-                latest_log.save()
-            else:
-                print(f"Warning: Latest log for Trip {trip.id} already had an end_time.")
-
-            new_log_entry = ELDLog.objects.create(
-                trip=trip,
-                event_type=new_status,
-                start_time=now,
-                end_time=None, # Active log has no end time yet
-                duration=0.0, # Duration is 0 until ended
-                location=location,
-                coordinates=coordinates,
-            )
-
-            trip.current_location = location
-            trip.current_coordinates = coordinates
-            trip.save()
-
-            serializer = ELDLogSerializer(new_log_entry)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-        except ELDLog.DoesNotExist:
-            new_log_entry = ELDLog.objects.create(
-                trip=trip,
-                event_type=new_status,
-                start_time=now, 
-                end_time=None,
-                duration=0.0,
-                location=location,
-                coordinates=coordinates,
-                # remarks=remarks
-            )
-            trip.current_location = location
-            trip.current_coordinates = coordinates
-            trip.save()
-            serializer = ELDLogSerializer(new_log_entry)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-        except Exception as e:
-            print(f"Error changing ELD status for Trip {trip_id}: {e}")
+            # Ending the old log, starting the new one and moving the trip commit together.
+            # Locking the trip row serializes concurrent status changes on the same trip,
+            # so two requests can't both close the same log and open parallel ones.
+            with transaction.atomic():
+                trip = get_object_or_404(
+                    Trip.objects.select_for_update().only(
+                        'id', 'status', 'driver', 'current_location', 'current_coordinates',
+                        'current_eld_status'
+                    ),
+                    pk=trip_id, driver=request.user
+                )
+                # Re-checked under the lock, as a concurrent request may have got there first
+                if trip.status != 'in_progress':
+                     return Response({"error": "Trip must be in progress to change ELD status."},
+                                     status=status.HTTP_400_BAD_REQUEST)
+                if trip.current_eld_status == new_status:
+                    return Response({"message": f"Status is already '{new_status}'."}, status=status.HTTP_200_OK)
+
+                location = request.data.get('location', trip.current_location) 
+                coordinates = request.data.get('coordinates', trip.current_coordinates)
+                remarks = request.data.get('remarks', '') 
+
+                now = timezone.now()
+
+                # The log being replaced is the latest one already started, the same rule
+                # current_eld_status follows (see sync_current_eld_status); logs planned
+                # ahead by route generation start in the future and are left alone
+                latest_log = ELDLog.objects.filter(trip=trip, start_time__lte=now).only(
+                    'id', 'event_type', 'start_time', 'end_time'
+                ).order_by('-start_time').first()
+
+                if latest_log is not None:
+                    if latest_log.end_time is None:
+                        duration_delta = now - latest_log.start_time
+                        ELDLog.objects.filter(pk=latest_log.pk).update(
+                            end_time=now,
+                            duration=duration_delta.total_seconds() / 3600
+                        )
+                    else:
+                        logger.warning("Latest log for Trip %s already had an end_time.", trip.id)
+
+                new_log_entry = ELDLog.objects.create(
+                    trip=trip,
+                    event_type=new_status,
+                    start_time=now,
+                    end_time=None, # Active log has no end time yet
+                    duration=0.0, # Duration is 0 until ended
+                    location=location,
+                    coordinates=coordinates,
+                    # remarks=remarks
+                )
+
+                Trip.objects.filter(pk=trip.pk).update(
+                    current_location=location,
+                    current_coordinates=coordinates,
+                    current_eld_status=new_status,
+                    updated_at=now
+                )
+
+            return Response(_eld_to_dict(new_log_entry), status=status.HTTP_201_CREATED)
+
+        except Http404:
+            raise
+        except Exception:
+            logger.exception("Error changing ELD status for Trip %s", trip_id)
             return Response({"error": "An unexpected error occurred."},
-                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)